@@ -1,7 +1,17 @@
 #!/usr/bin/python
 
+import os
+import tempfile
 from os.path import expanduser
 
+DEFAULT_URL = 'https://api.softlayer.com/xmlrpc/v3.1/'
+CONFIG_PATH = os.path.join(expanduser("~"), ".softlayer")
+CONFIG_TEMPLATE = ("[softlayer]\n"
+                   "username = {username}\n"
+                   "api_key = {api_key}\n"
+                   "endpoint_url = {endpoint_url}\n"
+                   "timeout = {timeout:d}\n")
+
 DOCUMENTATION = '''
 ---
 module: sl_config
@@ -23,11 +33,13 @@ options:
         - Value (seconds) to be used as the timeout for CLI commands
      required: false
      default: 600
-   custom_url:
+   endpoint_url:
      description:
         - Enter a value if you desire to use any other url besides the default
           for the endpoint url
      required: false
+     default: https://api.softlayer.com/xmlrpc/v3.1/
+     aliases: [custom_url]
 requirements:
     - "python >= 2.6:
 '''
@@ -48,23 +60,39 @@ EXAMPLES = '''
 - sl_config:
     username: user3
     api_key: abcdefghijklmnopqrstuvwxyz123456789
-    custom_url: http://mysoftlayer.com
+    endpoint_url: http://mysoftlayer.com
 '''
 
 def _update_credentials(module):
     """Write the configuration file with the given information"""
-    contents = "[softlayer]\n"
-    contents += "username = %s\n" % module.params['username']
-    contents += "api_key = %s\n" % module.params['api_key']
-    if module.params['custom_url']:
-        contents += "endpoint_url = %s\n" % module.params['custom_url']
-    else:
-        contents += "endpoint_url = https://api.softlayer.com/xmlrpc/v3.1/\n"
-    contents += "timeout = %d" % module.params['timeout']
+    contents = CONFIG_TEMPLATE.format(
+        username=module.params['username'],
+        api_key=module.params['api_key'],
+        endpoint_url=module.params['endpoint_url'],
+        timeout=module.params['timeout'])
+
+    # Leave the config alone if it already has these contents
+    try:
+        with open(CONFIG_PATH) as config:
+            if config.read() == contents:
+                module.exit_json(changed=False)
+    except IOError:
+        pass
 
-    home = expanduser("~")
-    with open('%s/.softlayer' % home, 'w') as config:
-        config.write(contents)
+    # Write a temporary file next to the config and move it into place, so
+    # the config is never left half written
+    config = tempfile.NamedTemporaryFile(dir=os.path.dirname(CONFIG_PATH),
+                                         prefix='.softlayer', delete=False)
+    try:
+        config.write(contents.encode('utf-8'))
+        config.flush()
+        os.fsync(config.fileno())
+        config.close()
+        os.rename(config.name, CONFIG_PATH)
+    except Exception:
+        config.close()
+        os.remove(config.name)
+        raise
 
     module.exit_json(changed=True)
 
@@ -74,7 +102,8 @@ def main():
             username      = dict(required=True, type='str'),
             api_key       = dict(required=True, type='str'),
             timeout       = dict(default=600, type='int'),
-            custom_url    = dict(default=None, type='str')
+            endpoint_url  = dict(default=DEFAULT_URL, type='str',
+                                 aliases=['custom_url'])
         )
     )
 
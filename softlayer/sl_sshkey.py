@@ -1,5 +1,6 @@
 #!/usr/bin/python
 import base64
+import binascii
 import hashlib
 
 try:
@@ -41,6 +42,13 @@ options:
           key will be returned and no key will be created. Must be present when
           creating, not necessary when deleting
      default: None
+   fingerprint_algo:
+     description:
+        - The hash used to fingerprint keys when looking for an existing
+          copy of public_key. SoftLayer stores md5 fingerprints, with sha256
+          the fingerprints of the account's keys are computed locally
+     choices: [md5, sha256]
+     default: md5
 requirements:
     - "python >= 2.6:
     - "softlayer"
@@ -63,24 +71,73 @@ EXAMPLES = '''
     label: key1
 '''
 
+# Indexes of each account's keys, keyed by (username, api_key, algo), so the
+# key list is only fetched from SoftLayer once per process
+_KEYS_CACHE = {}
+
+def _key_fingerprint(key, algo):
+    """Returns the fingerprint of a key from the account using algo, or None
+    if its public key can't be parsed"""
+    if algo == 'md5':
+        return key['fingerprint']
+    try:
+        return _get_fingerprint(key['key'], algo)
+    except (KeyError, AttributeError, IndexError, TypeError, ValueError):
+        return None
+
+def _index_keys(keys, algo):
+    """Returns a pair of dicts mapping fingerprint and label to the given keys.
+    Keys whose fingerprint can't be determined are only indexed by label"""
+    by_fingerprint = {}
+    for k in keys:
+        finger = _key_fingerprint(k, algo)
+        if finger:
+            by_fingerprint[finger] = k
+    return by_fingerprint, dict((k['label'], k) for k in keys)
+
+def _get_key_index(module, mgr):
+    """Returns the fingerprint and label indexes of the keys on the account,
+    fetching the keys only if they have not been cached yet"""
+    algo = module.params['fingerprint_algo']
+    account = (module.params['username'], module.params['api_key'], algo)
+    index = _KEYS_CACHE.get(account)
+    if index is None:
+        index = _KEYS_CACHE[account] = _index_keys(mgr.list_keys(), algo)
+    return index
+
+def _forget_account(module):
+    """Drops every cached key index for the account, whatever the algo"""
+    account = (module.params['username'], module.params['api_key'])
+    for cached in list(_KEYS_CACHE):
+        if cached[:2] == account:
+            del _KEYS_CACHE[cached]
+
 def _create_key(module, mgr):
     """Checks if the given key already exists by looking for its fingerprint.
     Returns the existing key if it finds a match, creates a new key if not"""
     label = module.params['label']
     public_key = module.params['public_key']
-    finger = _get_fingerprint(public_key)
-    keys = mgr.list_keys()
-    for k in keys:
-        if k['fingerprint'] == finger:
-            if k['label'] == label:
+    algo = module.params['fingerprint_algo']
+    finger = _get_fingerprint(public_key, algo)
+    account = (module.params['username'], module.params['api_key'], algo)
+    if account not in _KEYS_CACHE:
+        # Re-runs usually find the key under its own label, which only needs
+        # the keys with that label. Anything else has to look at the whole
+        # account for the same key under another label
+        for k in mgr.list_keys(label=label):
+            if _key_fingerprint(k, algo) == finger:
                 module.exit_json(changed=False, key=k)
-            else:
-                module.exit_json(changed=False, key=k,
-                                 msg=("A key with this fingerprint already exists on "
-                                      "this account, using key %s" % k['label']))
-        if k['label'] == label:
-            module.fail_json(msg=("A key with label %s already exists with " % label +
-                                  "a different public key on this account"))
+    by_fingerprint, by_label = _get_key_index(module, mgr)
+    existing = by_fingerprint.get(finger)
+    if existing and existing['label'] == label:
+        module.exit_json(changed=False, key=existing)
+    elif existing:
+        module.exit_json(changed=False, key=existing,
+                         msg=("A key with this fingerprint already exists on "
+                              "this account, using key %s" % existing['label']))
+    elif by_label.get(label):
+        module.fail_json(msg=("A key with label %s already exists with " % label +
+                              "a different public key on this account"))
 
     if not public_key:
         module.fail_json(msg="A key must be given. No sshkey created.")
@@ -88,15 +145,49 @@ def _create_key(module, mgr):
     key = mgr.add_key(public_key, label)
 
     if key:
+        # Keep this algo's cached index in step with the account instead of
+        # refetching, the indexes for any other algo are now out of date
+        by_fingerprint[finger] = key
+        by_label[key.get('label', label)] = key
+        _forget_account(module)
+        _KEYS_CACHE[account] = (by_fingerprint, by_label)
         module.exit_json(changed=True, key=key)
     else:
         module.fail_json(msg="The key was not succesfully created")
 
-def _get_fingerprint(public_key):
+# Offsets of each byte's two hex digits within an md5 hexdigest
+_PAIRS = range(0, 32, 2)
+
+def _md5(data):
+    """Returns an md5 hash of data that is usable on FIPS enabled hosts"""
+    try:
+        return hashlib.md5(data, usedforsecurity=False)
+    except TypeError:
+        # usedforsecurity is only accepted by python 3.9 and later
+        return hashlib.md5(data)
+
+def _get_fingerprint(public_key, algo='md5'):
     """Determines and returns the fingerprint for the given public_key"""
     key = base64.b64decode(public_key.strip().split()[1].encode('ascii'))
-    fp_plain = hashlib.md5(key).hexdigest()
-    return ':'.join(a+b for a,b in zip(fp_plain[::2], fp_plain[1::2]))
+    if algo == 'sha256':
+        return _sha256_fingerprint(key)
+    return _md5_fingerprint(key)
+
+def _md5_fingerprint(key):
+    """Returns the colon separated md5 fingerprint of the decoded key"""
+    digest = _md5(key).digest()
+    try:
+        return digest.hex(':')
+    except (AttributeError, TypeError):
+        # bytes.hex only takes a separator from python 3.8
+        fp_hex = binascii.hexlify(digest)
+        return b':'.join([fp_hex[i:i+2] for i in _PAIRS]).decode('ascii')
+
+def _sha256_fingerprint(key):
+    """Returns the fingerprint of the decoded key in the SHA256: format used
+    by ssh-keygen"""
+    digest = base64.b64encode(hashlib.sha256(key).digest()).decode('ascii')
+    return 'SHA256:' + digest.rstrip('=')
 
 def _delete_key(module, mgr):
     """Deletes the key with the given label"""
@@ -106,10 +197,31 @@ def _delete_key(module, mgr):
         module.fail_json(msg="More than one sshkey named %s. No keys deleted" % label)
     elif keys:
         mgr.delete_key(keys[0]['id'])
+        _forget_account(module)
         module.exit_json(changed=True)
     else:
         module.exit_json(changed=False)
 
+# SoftLayer clients keyed by (username, api_key), so repeated calls in the
+# same process reuse the client's session
+_CLIENT_CACHE = {}
+
+def _get_client(username, api_key):
+    """Returns a SoftLayer client for the account, creating it on first use"""
+    key = (username, api_key)
+    client = _CLIENT_CACHE.get(key)
+    if client is None:
+        client = _CLIENT_CACHE[key] = SoftLayer.Client(username=username,
+                                                       api_key=api_key)
+    return client
+
+def _get_manager(client):
+    """Returns the SshKeyManager for the client, created once per client"""
+    mgr = getattr(client, '_sshkey_manager', None)
+    if mgr is None:
+        mgr = client._sshkey_manager = SoftLayer.SshKeyManager(client)
+    return mgr
+
 def main():
     module = AnsibleModule(
         argument_spec = dict(
@@ -117,16 +229,16 @@ def main():
             api_key      = dict(required=True, type='str'),
             state        = dict(default='present', choices=['present', 'absent']),
             label        = dict(required=True, type='str'),
-            public_key   = dict(default=None, type='str')
+            public_key   = dict(default=None, type='str'),
+            fingerprint_algo = dict(default='md5', choices=['md5', 'sha256'])
         )
     )
 
     if not HAS_SOFTLAYER:
         module.fail_json(msg='softlayer is required for this module')
 
-    client = SoftLayer.Client(username=module.params['username'],
-                              api_key=module.params['api_key'])
-    mgr = SoftLayer.SshKeyManager(client)
+    client = _get_client(module.params['username'], module.params['api_key'])
+    mgr = _get_manager(client)
     state = module.params['state']
 
     if state == 'present':
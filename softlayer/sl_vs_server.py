@@ -7,6 +7,28 @@ try:
 except ImportError:
     HAS_SOFTLAYER = False
 
+try:
+    from concurrent.futures import ThreadPoolExecutor
+    HAS_FUTURES = True
+except ImportError:
+    HAS_FUTURES = False
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+    HAS_REQUESTS = True
+except ImportError:
+    HAS_REQUESTS = False
+
+# Upper bound on the number of servers canceled at the same time
+MAX_CANCEL_WORKERS = 16
+
+# Specifications that must not be empty to order a server
+_REQUIRED = ('domain', 'hostname', 'datacenter', 'memory', 'cpus')
+# Specifications only passed along with the order when given
+_OPTIONAL = ('public_vlan', 'private_vlan', 'disks', 'post_uri', 'private',
+             'ssh_keys', 'nic_speed', 'tags')
+
 DOCUMENTATION = '''
 ---
 module: sl_vs_server
@@ -63,8 +85,8 @@ options:
    datacenter:
      description:
        - The short name of the data center in which the VS
-         should reside
-       require: true
+         should reside. Required when a new server has to be ordered
+     required: false
    os_code:
      description:
        - The code of the operating system to use, formatted as
@@ -135,6 +157,13 @@ options:
          is created
      required: false
      default: True
+   detail:
+     description:
+       - If True, look up the full details of a server that already exists
+         before returning it. If False, return the server as found when
+         listing instances, which saves an API call
+     required: false
+     default: False
 requirements:
     - "python >= 2.6:
     - "softlayer"
@@ -218,58 +247,50 @@ EXAMPLES = '''
 
 def _create_server(module, mgr):
     """Creates a virtual server on softlayer with the given specifications"""
-    hostname = module.params['hostname']
-    domain = module.params['domain']
-    # These are the basic specifications that need to be specified
-    instance_specs = dict(
-        domain=domain,
-        hostname=hostname,
-        memory=module.params['memory'],
-        cpus=module.params['cpus'],
-        datacenter=module.params['datacenter'],
-        hourly=module.params['hourly']
-    )
-    # Make sure all necessary keys have values
-    for key in instance_specs:
-        if not instance_specs[key]:
-            module.fail_json(msg='%s must be specified to order instance' % key)
-
-    # Check that either one of but not both of image_id and os_code were given
-    image_id = module.params['image_id']
-    os_code = module.params['os_code']
-    if(module.params['image_id'] and module.params['os_code']):
-        module.fail_json(msg='image_id and os_code cannot both be specified')
-    elif image_id:
-        instance_specs['image_id'] = image_id
-    elif os_code:
-        instance_specs['os_code'] = os_code
-    else:
+    params = module.params
+    # AnsibleModule rejects both being given, but one of them is only needed
+    # when ordering
+    image_id = params['image_id']
+    os_code = params['os_code']
+    if not (image_id or os_code):
         module.fail_json(msg='You must specify either the OS code or image id')
 
-    # These will always have a boolean value stored
-    instance_specs['local_disk'] = module.params['local_disk']
-    instance_specs['dedicated'] = module.params['dedicated']
+    # These are the basic specifications that need to be specified, along
+    # with local_disk and dedicated which will always have a boolean value
+    instance_specs = {
+        'domain': params['domain'],
+        'hostname': params['hostname'],
+        'memory': params['memory'],
+        'cpus': params['cpus'],
+        'datacenter': params['datacenter'],
+        'hourly': params['hourly'],
+        'local_disk': params['local_disk'],
+        'dedicated': params['dedicated'],
+        ('image_id' if image_id else 'os_code'): image_id or os_code,
+    }
+
+    # AnsibleModule only checks these were passed, make sure they have values
+    missing = [key for key in _REQUIRED if not instance_specs[key]]
+    if missing:
+        module.fail_json(msg='%s must be specified to order instance' % ', '.join(missing))
 
     #Add any additional specifications
-    for optional_param in ('public_vlan', 'private_vlan', 'disks',
-                           'post_uri', 'private', 'ssh_keys',
-                           'nic_speed', 'tags'):
-        if module.params[optional_param]:
-            instance_specs[optional_param] = module.params[optional_param]
+    params_get = params.get
+    for optional_param in _OPTIONAL:
+        value = params_get(optional_param)
+        if value:
+            instance_specs[optional_param] = value
 
-    # Create instance
-    mgr.create_instance(**instance_specs)
-    inst = mgr.list_instances(hostname=hostname, domain=domain)[0]
+    # Create instance, the order returns the new instance along with its id
+    inst_id = mgr.create_instance(**instance_specs)['id']
 
     if module.params['wait_for_ready']:
         # wait for it to be ready
-        is_ready = mgr.wait_for_ready(inst['id'], 900)
-        if is_ready:
-            module.exit_json(changed=True, server=inst)
-        else:
+        is_ready = mgr.wait_for_ready(inst_id, 900)
+        if not is_ready:
             module.fail_json(msg='Timeout while waiting for server. It may not be ready.')
 
-    inst = mgr.get_instance(inst['id'])
+    inst = mgr.get_instance(inst_id)
     module.exit_json(changed=True, server=inst)
 
 def _delete_server(module, mgr):
@@ -281,11 +302,32 @@ def _delete_server(module, mgr):
     if not inst:
         module.exit_json(changed=False, msg='no servers were found with this specification')
 
-    for server in inst:
-        mgr.wait_for_transaction(server['id'], 900)
-        mgr.cancel_instance(server['id'])
+    def cancel(server):
+        """Returns the server's id and the error canceling it, or None"""
+        try:
+            mgr.wait_for_transaction(server['id'], 900)
+            mgr.cancel_instance(server['id'])
+        except Exception as e:
+            return server['id'], str(e)
+        return server['id'], None
+
+    # The waits and cancels are network bound, so run them side by side
+    # rather than one server after another
+    if HAS_FUTURES and len(inst) > 1:
+        with ThreadPoolExecutor(max_workers=min(MAX_CANCEL_WORKERS, len(inst))) as ex:
+            results = list(ex.map(cancel, inst))
+    else:
+        results = [cancel(server) for server in inst]
+
+    canceled = [server_id for server_id, error in results if error is None]
+    errors = ['server %s: %s' % (server_id, error)
+              for server_id, error in results if error is not None]
+    if errors:
+        module.fail_json(changed=bool(canceled), canceled=canceled,
+                         msg='Failed to cancel %d of %d servers: %s' %
+                         (len(errors), len(inst), '; '.join(errors)))
 
-    module.exit_json(changed=True)
+    module.exit_json(changed=True, canceled=canceled)
 
 def _find_servers(module, mgr):
     """Returns a list of servers that match the given paramaters"""
@@ -294,12 +336,50 @@ def _find_servers(module, mgr):
                           hostname=module.params['hostname'])
 
     # These paramaters are optional to narrow the list
-    for optional_param in ['datacenter']:
-        if module.params[optional_param]:
-            instance_specs[optional_param] = module.params[optional_param]
+    params_get = module.params.get
+    for optional_param in ('datacenter',):
+        value = params_get(optional_param)
+        if value:
+            instance_specs[optional_param] = value
 
     return mgr.list_instances(**instance_specs)
 
+# SoftLayer clients keyed by (username, api_key), so repeated calls in the
+# same process reuse the client's session
+_CLIENT_CACHE = {}
+
+def _get_client(username, api_key):
+    """Returns a SoftLayer client for the account, creating it on first use"""
+    key = (username, api_key)
+    client = _CLIENT_CACHE.get(key)
+    if client is None:
+        client = _CLIENT_CACHE[key] = SoftLayer.Client(username=username,
+                                                       api_key=api_key)
+        _pool_connections(client)
+    return client
+
+def _pool_connections(client):
+    """Gives the client's HTTP session enough pooled connections for the
+    concurrent cancels in _delete_server to share, so each thread reuses an
+    open connection instead of making its own. SoftLayer's own retry policy
+    is carried over unchanged; it only retries failed connects, before any
+    request is sent, so POSTed XML-RPC calls are never replayed"""
+    # Debug and timing transports wrap the transport making the calls
+    transport = getattr(client.transport, 'transport', client.transport)
+    session = getattr(transport, 'client', None)
+    if HAS_REQUESTS and isinstance(session, requests.Session):
+        session.mount('https://', HTTPAdapter(
+            pool_connections=MAX_CANCEL_WORKERS,
+            pool_maxsize=MAX_CANCEL_WORKERS,
+            max_retries=session.get_adapter('https://').max_retries))
+
+def _get_manager(client):
+    """Returns the VSManager for the client, created once per client"""
+    mgr = getattr(client, '_vs_manager', None)
+    if mgr is None:
+        mgr = client._vs_manager = SoftLayer.VSManager(client)
+    return mgr
+
 def main():
     module = AnsibleModule(
         argument_spec = dict(
@@ -326,16 +406,17 @@ def main():
             tags           = dict(default=None, type='str'),
             public_ip      = dict(default=None, type='str'),
             private_ip     = dict(default=None, type='str'),
-            wait_for_ready = dict(default=True, type='bool')
-        )
+            wait_for_ready = dict(default=True, type='bool'),
+            detail         = dict(default=False, type='bool')
+        ),
+        mutually_exclusive = [['image_id', 'os_code']]
     )
 
     if not HAS_SOFTLAYER:
         module.fail_json(msg='softlayer is required for this module')
 
-    client = SoftLayer.Client(username=module.params['username'],
-                              api_key=module.params['api_key'])
-    mgr = SoftLayer.VSManager(client)
+    client = _get_client(module.params['username'], module.params['api_key'])
+    mgr = _get_manager(client)
     state = module.params['state']
     hostname = module.params['hostname']
     domain = module.params['domain']
@@ -345,9 +426,10 @@ def main():
         # If a server exists with that hostname and domain, return it
         # Create a new server otherwise
         inst = mgr.list_instances(hostname=hostname, domain=domain)
-        if inst:
-            inst = mgr.get_instance(inst[0]['id'])
-            module.exit_json(changed=False, server=inst)
+        if inst and module.params['detail']:
+            module.exit_json(changed=False, server=mgr.get_instance(inst[0]['id']))
+        elif inst:
+            module.exit_json(changed=False, server=inst[0])
         else:
             _create_server(module, mgr)
     elif state == 'absent':